@@ -1,19 +1,77 @@
 import streamlit as st
 import requests
 import json
-from datetime import date
+import os
+from datetime import date, datetime, time as dtime, timedelta
 import pandas as pd
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 
+from charts import (
+    create_alternative_drugs_chart,
+    create_comorbidity_impact_chart,
+    create_patient_summary_charts,
+    create_risk_breakdown_chart,
+    create_risk_gauge_chart,
+)
+from export import build_export
+from store import SharedStore
+
 # --------------------
 # Backend API endpoint
 # --------------------
 BACKEND_URL = st.secrets["BACKEND_URL"]  # Change to your backend URL
 API_KEY = st.secrets["API_KEY"]
+# Optional: SQLite file shared by all worker processes on this host. Stored
+# results hold full patient payloads and are deleted after the retention period.
+SHARED_STORE_PATH = st.secrets.get("SHARED_STORE_PATH")
+SHARED_STORE_RETENTION_DAYS = st.secrets.get("SHARED_STORE_RETENTION_DAYS", 30)
+
+@st.cache_resource
+def get_shared_store():
+    """One SharedStore per process, or None when the shared tier is not configured"""
+    if not SHARED_STORE_PATH:
+        return None
+    return SharedStore(SHARED_STORE_PATH, result_retention_s=SHARED_STORE_RETENTION_DAYS * 24 * 3600)
+
+@st.cache_resource
+def get_export_executor():
+    """Background threads that build bulk exports off the script thread"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="export")
+
+def patient_summary_data(payload):
+    """Fields shown in the patient summary charts, taken from an analysis payload"""
+    vitals = payload["vitals"]
+    labs = payload["lab_results"]
+    return {
+        "age": payload["patient_info"]["age"],
+        "sex": payload["patient_info"]["sex"],
+        "weight_kg": payload["patient_info"]["weight_kg"],
+        "height_cm": payload["patient_info"]["height_cm"],
+        "bp_systolic": vitals["blood_pressure_mmHg"]["systolic"],
+        "bp_diastolic": vitals["blood_pressure_mmHg"]["diastolic"],
+        "heart_rate": vitals["heart_rate_bpm"],
+        "total_chol": labs["lipid_panel"]["total_cholesterol_mg_dL"],
+        "ldl": labs["lipid_panel"]["LDL_cholesterol_mg_dL"],
+        "hdl": labs["lipid_panel"]["HDL_cholesterol_mg_dL"],
+        "trig": labs["lipid_panel"]["triglycerides_mg_dL"],
+        "egfr": labs["metabolic_panel"]["eGFR_ml_min"],
+        "hba1c": labs["endocrine"]["HbA1c_percent"],
+        "comorbidities": payload["comorbidities"],
+        "current_medications": payload["current_medications"]
+    }
+
+def post_to_backend(payload):
+    """Call the risk assessment backend"""
+    response = requests.post(BACKEND_URL, 
+                             headers={"Authorization": f"Bearer {API_KEY}"},
+                             json=payload)
+    response.raise_for_status()
+    return response.json()
 
 st.set_page_config(page_title="Patient Risk Dashboard", layout="wide")
 
@@ -106,6 +164,68 @@ if 'is_analyzing' not in st.session_state:
     st.session_state.is_analyzing = False
 if 'patient_data' not in st.session_state:
     st.session_state.patient_data = {}
+if 'assessment_history' not in st.session_state:
+    st.session_state.assessment_history = []  # (assessment_id, created_at, result)
+if 'export_job' not in st.session_state:
+    st.session_state.export_job = None
+
+# Restore a stored assessment, e.g. after failing over to another worker process
+shared_store = get_shared_store()
+if st.session_state.analysis_results is None and shared_store and "assessment" in st.query_params:
+    restored_id = st.query_params["assessment"]
+    stored = shared_store.load_result(restored_id)
+    if stored is not None:
+        restored_payload, restored_at, restored_result = stored
+        st.session_state.analysis_results = restored_result
+        st.session_state.patient_data = patient_summary_data(restored_payload)
+        if all(entry[0] != restored_id for entry in st.session_state.assessment_history):
+            st.session_state.assessment_history.append((restored_id, restored_at, restored_result))
+
+# --------------------
+# BULK EXPORT
+# --------------------
+def discard_export():
+    """Delete the artifact of a finished export job"""
+    job = st.session_state.export_job
+    if job is not None and job.done() and not job.exception() and os.path.exists(job.result()):
+        os.remove(job.result())
+    st.session_state.export_job = None
+
+@st.fragment(run_every=1)
+def poll_export_job():
+    """Re-check the running export every second without rerunning the whole app"""
+    if st.session_state.export_job.done():
+        st.rerun()
+    st.caption("⏳ Building export...")
+
+def show_export_status():
+    """Show progress, failure or the download for the current export job"""
+    job = st.session_state.export_job
+    if job is None:
+        return
+    if not job.done():
+        poll_export_job()
+    elif job.exception():
+        st.error(f"Export failed: {job.exception()}")
+    elif not os.path.exists(job.result()):
+        st.caption("Export expired - build it again to download.")
+    else:
+        # download_button needs the bytes on every rerun, so serving the
+        # artifact reads the whole ZIP into memory (unlike building it)
+        with open(job.result(), "rb") as artifact:
+            st.download_button("📥 Download export", data=artifact,
+                               file_name="risk_assessments_export.zip",
+                               mime="application/zip",
+                               use_container_width=True)
+
+def stored_history_range(start, end):
+    """iter_results bounds for results saved between two dates, pinned to the rows stored now"""
+    after = (datetime.combine(start, dtime.min).timestamp(), "")
+    end_bound = (datetime.combine(end + timedelta(days=1), dtime.min).timestamp(), "")
+    latest = shared_store.latest_result()
+    # Pinning the upper bound makes both export passes read exactly the same rows
+    until = min(tuple(latest), end_bound) if latest else after
+    return after, until
 
 # --------------------
 # SIDEBAR - Input Sections
@@ -301,29 +421,21 @@ with st.sidebar:
         diet = st.text_input("Diet", "moderate in saturated fat")
         exercise = st.text_input("Exercise Frequency", "2-3 days per week")
 
-    # Store patient data for visualization
-    st.session_state.patient_data = {
-        "age": age,
-        "sex": sex,
-        "weight_kg": weight_kg,
-        "height_cm": height_cm,
-        "bp_systolic": bp_systolic,
-        "bp_diastolic": bp_diastolic,
-        "heart_rate": heart_rate,
-        "total_chol": total_chol,
-        "ldl": ldl,
-        "hdl": hdl,
-        "trig": trig,
-        "egfr": egfr,
-        "hba1c": hba1c,
-        "comorbidities": comorbidities,
-        "current_medications": current_medications
-    }
+    with st.expander("Display Options", expanded=False):
+        st.toggle("Render sections on demand", value=True, key="lazy_render",
+                  help="Only build the chart or table you open; other sections show a placeholder until selected.")
+        if shared_store:
+            stats = shared_store.stats
+            st.caption(f"Shared store: {stats.hit_rate:.0%} hit rate "
+                       f"({stats.cross_process_hit_rate:.0%} from other workers), "
+                       f"{stats.mean_lock_wait_ms:.1f} ms mean lock wait")
 
     # Submit Button in Sidebar
     if st.button("🔍 Analyze Risk", type="primary", use_container_width=True):
         st.session_state.is_analyzing = True
         st.session_state.analysis_results = None
+        # Otherwise a failed analysis would restore the previous result on the next rerun
+        st.query_params.pop("assessment", None)
 
         payload = {
             "patient_info": {
@@ -403,13 +515,18 @@ with st.sidebar:
                 # Simulate some processing time for better UX
                 time.sleep(1)
                 
-                response = requests.post(BACKEND_URL, 
-                                     headers={"Authorization": f"Bearer {API_KEY}"},
-                                     json=payload)
+                if shared_store:
+                    result = shared_store.get_or_compute(payload, lambda: post_to_backend(payload))
+                    assessment_id = shared_store.save_result(payload, result)
+                    st.query_params["assessment"] = assessment_id
+                else:
+                    result = post_to_backend(payload)
+                    assessment_id = uuid.uuid4().hex
             
-            response.raise_for_status()
-            result = response.json()
             st.session_state.analysis_results = result
+            # Summary charts show the analyzed patient, not later sidebar edits
+            st.session_state.patient_data = patient_summary_data(payload)
+            st.session_state.assessment_history.append((assessment_id, time.time(), result))
             st.session_state.is_analyzing = False
             st.rerun()
 
@@ -417,162 +534,59 @@ with st.sidebar:
             st.error(f"Error: {e}")
             st.session_state.is_analyzing = False
 
-# --------------------
-# VISUALIZATION FUNCTIONS
-# --------------------
-def create_patient_summary_charts(patient_data):
-    """Create charts for patient summary"""
-    # Create subplots
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Blood Pressure', 'Lipid Profile', 'Kidney Function', 'Medications'),
-        specs=[[{"type": "indicator"}, {"type": "bar"}],
-               [{"type": "indicator"}, {"type": "pie"}]]
-    )
-    
-    # Blood Pressure indicator
-    fig.add_trace(go.Indicator(
-        mode = "number+gauge", 
-        value = patient_data["bp_systolic"],
-        number = {"suffix": "/" + str(patient_data["bp_diastolic"]) + " mmHg"},
-        domain = {'x': [0.25, 0.75], 'y': [0.7, 0.9]},
-        gauge = {
-            'shape': "bullet",
-            'axis': {'range': [80, 200]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [80, 120], 'color': "lightgreen"},
-                {'range': [120, 140], 'color': "yellow"},
-                {'range': [140, 200], 'color': "red"}
-            ]
-        }
-    ), row=1, col=1)
-    
-    # Lipid Profile bar chart
-    lipids = ['Total Cholesterol', 'LDL', 'HDL', 'Triglycerides']
-    values = [patient_data["total_chol"], patient_data["ldl"], patient_data["hdl"], patient_data["trig"]]
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
-    
-    fig.add_trace(go.Bar(
-        x=lipids,
-        y=values,
-        marker_color=colors,
-        text=values,
-        textposition='auto',
-    ), row=1, col=2)
-    
-    # Kidney Function indicator
-    fig.add_trace(go.Indicator(
-        mode = "number+gauge", 
-        value = patient_data["egfr"],
-        number = {"suffix": " mL/min"},
-        domain = {'x': [0.25, 0.75], 'y': [0.1, 0.3]},
-        gauge = {
-            'shape': "bullet",
-            'axis': {'range': [0, 120]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [90, 120], 'color': "lightgreen"},
-                {'range': [60, 90], 'color': "yellow"},
-                {'range': [30, 60], 'color': "orange"},
-                {'range': [0, 30], 'color': "red"}
-            ]
-        }
-    ), row=2, col=1)
-    
-    # Medications pie chart
-    med_names = [med["name"] for med in patient_data["current_medications"]]
-    med_counts = [1] * len(med_names)  # Simple count for pie chart
-    
-    fig.add_trace(go.Pie(
-        labels=med_names,
-        values=med_counts,
-        hole=.4,
-        textinfo='label+percent',
-        insidetextorientation='radial'
-    ), row=2, col=2)
-    
-    fig.update_layout(height=600, showlegend=False, title_text="Patient Health Summary", title_x=0.5)
-    return fig
-
-def create_risk_breakdown_chart(risk_breakdown):
-    """Create a radar chart for risk breakdown"""
-    categories = [risk['system'] for risk in risk_breakdown['systemic_risks']]
-    values = [risk['risk_percent'] for risk in risk_breakdown['systemic_risks']]
-    
-    fig = go.Figure(data=go.Scatterpolar(
-        r=values + [values[0]],  # Close the circle
-        theta=categories + [categories[0]],  # Close the circle
-        fill='toself',
-        line=dict(color='#1f77b4'),
-        name="Risk Levels"
-    ))
-    
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 10]
-            )),
-        showlegend=False,
-        title="Risk Breakdown by Category",
-        title_x=0.5
-    )
-    
-    return fig
-
-def create_comorbidity_impact_chart(comorbidity_impact):
-    """Create a bar chart for comorbidity impact"""
-    comorbidities = [comorbidity['comorbidity_description'] for comorbidity in comorbidity_impact]
-    impacts = [comorbidity['risk_change_percent'] for comorbidity in comorbidity_impact]
-    
-    # Color based on impact level
-    colors = []
-    for impact in impacts:
-        if impact >= 7:
-            colors.append('#dc3545')  # High risk - red
-        elif impact >= 4:
-            colors.append('#ffc107')  # Medium risk - yellow
+    with st.expander("📦 Bulk Export", expanded=False):
+        export_sources = ["This session"] + (["Stored history"] if shared_store else [])
+        export_source = st.radio("Assessments", export_sources, key="export_source")
+        if export_source == "Stored history":
+            # Stored history is shared by every user of the host; require an explicit range
+            export_dates = st.date_input("Saved between", value=(date.today(), date.today()),
+                                         max_value=date.today(), key="export_dates")
+        export_format = st.radio("Table format", ["Parquet", "CSV"], horizontal=True, key="export_format")
+        export_pdf = st.checkbox("Include per-patient PDF summaries", key="export_pdf")
+
+        export_running = st.session_state.export_job is not None and not st.session_state.export_job.done()
+        if export_source == "This session":
+            export_ready = bool(st.session_state.assessment_history)
         else:
-            colors.append('#28a745')  # Low risk - green
-    
-    fig = go.Figure(data=[go.Bar(
-        x=comorbidities,
-        y=impacts,
-        marker_color=colors,
-        text=impacts,
-        textposition='auto',
-    )])
-    
-    fig.update_layout(
-        title="Comorbidity Impact on Drug Risk",
-        xaxis_title="Comorbidities",
-        yaxis_title="Impact Level",
-        yaxis=dict(range=[0, 10]),
-        title_x=0.5
-    )
-    
-    return fig
+            export_ready = len(export_dates) == 2  # both ends of the range picked
+        if st.button("Build export", use_container_width=True, disabled=export_running or not export_ready):
+            discard_export()
+            if export_source == "This session":
+                history = list(st.session_state.assessment_history)
+                iter_assessments = lambda: iter(history)
+            else:
+                after, until = stored_history_range(*export_dates)
+                iter_assessments = lambda: shared_store.iter_results(after=after, until=until)
+            st.session_state.export_job = get_export_executor().submit(
+                build_export, iter_assessments, export_format.lower(), export_pdf)
+
+        show_export_status()
 
-def create_alternative_drugs_chart(alternative_drugs):
-    """Create a comparison chart for alternative drugs"""
-    drugs = [drug['name'] for drug in alternative_drugs]
-    risk = [drug['predicted_risk_percent'] for drug in alternative_drugs]
-    
-    fig = go.Figure(data=[
-        go.Bar(name='Risk score', x=drugs, y=risk, marker_color='#2ca02c')
-    ])
-    
-    fig.update_layout(
-        barmode='group',
-        title="Alternative Drugs: Efficacy vs Safety",
-        xaxis_title="Drugs",
-        yaxis_title="Score",
-        yaxis=dict(range=[0, 100]),
-        title_x=1
-    )
-    
-    return fig
+# --------------------
+# ON-DEMAND RENDERING
+# --------------------
+def render_tabs(labels, renderers, key):
+    """Render tabbed content, building only the selected tab in on-demand mode"""
+    if not st.session_state.get("lazy_render", True):
+        # st.tabs runs and ships every tab body on each rerun
+        for tab, render in zip(st.tabs(labels), renderers):
+            with tab:
+                render()
+        return
+
+    selected = st.radio(key, labels, horizontal=True, key=key, label_visibility="collapsed")
+    renderers[labels.index(selected)]()
+
+def render_on_demand(label, render, key):
+    """Render a section directly, or behind a toggle in on-demand mode"""
+    if not st.session_state.get("lazy_render", True):
+        render()
+        return
+
+    if st.toggle(label, key=key):
+        render()
+    else:
+        st.caption("Hidden until opened - switch on above to load this section.")
 
 # --------------------
 # MAIN CONTENT - Results Display
@@ -600,8 +614,12 @@ elif st.session_state.analysis_results:
     # Display Results in Main Area
     # --------------------
     st.subheader("👤 Patient Health Summary")
-    summary_fig = create_patient_summary_charts(st.session_state.patient_data)
-    st.plotly_chart(summary_fig, use_container_width=True)
+
+    def show_patient_summary():
+        summary_fig = create_patient_summary_charts(st.session_state.patient_data)
+        st.plotly_chart(summary_fig, use_container_width=True)
+
+    render_on_demand("Show health summary charts", show_patient_summary, key="show_patient_summary")
     
     st.subheader("📊 Overall Risk Assessment")
     
@@ -629,27 +647,7 @@ elif st.session_state.analysis_results:
                  help="Recommended clinical action")
     
     # Risk gauge chart
-    gauge_fig = go.Figure(go.Indicator(
-        mode = "gauge+number",
-        value = risk_score,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': "Overall Risk Score", 'font': {'size': 24}},
-        gauge = {
-            'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
-            'bar': {'color': risk_color},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "gray",
-            'steps': [
-                {'range': [0, 30], 'color': '#28a745'},
-                {'range': [30, 70], 'color': '#ffc107'},
-                {'range': [70, 100], 'color': '#dc3545'}],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': risk_score}}))
-    
-    gauge_fig.update_layout(height=300)
+    gauge_fig = create_risk_gauge_chart(risk_score, risk_color)
     st.plotly_chart(gauge_fig, use_container_width=True)
     
     # Interpretation in a styled card
@@ -663,47 +661,68 @@ elif st.session_state.analysis_results:
 
     st.subheader("📈 Risk Breakdown")
     
-    tab1, tab2, tab3 = st.tabs(["Risk Radar", "Systemic Risks Table", "Comorbidity Impact"])
-    
-    with tab1:
+    def show_risk_radar():
         radar_fig = create_risk_breakdown_chart(result['risk_breakdown'])
         st.plotly_chart(radar_fig, use_container_width=True)
-    
-    with tab2:
+
+    def show_systemic_risks():
         systemic_risks_df = pd.DataFrame(result['risk_breakdown']['systemic_risks'])
         st.dataframe(systemic_risks_df, use_container_width=True)
-    
-    with tab3:
+
+    def show_comorbidity_impact():
         comorbidity_impact_df = pd.DataFrame(result['risk_breakdown']['comorbidity_impact'])
         comorbidity_fig = create_comorbidity_impact_chart(result['risk_breakdown']['comorbidity_impact'])
         st.plotly_chart(comorbidity_fig, use_container_width=True)
         st.dataframe(comorbidity_impact_df, use_container_width=True)
 
+    render_tabs(["Risk Radar", "Systemic Risks Table", "Comorbidity Impact"],
+                [show_risk_radar, show_systemic_risks, show_comorbidity_impact],
+                key="risk_breakdown_view")
+
     st.subheader("💊 Drug Interactions")
-    interactions_df = pd.DataFrame(result['drug_interactions'])
-    st.dataframe(interactions_df, use_container_width=True)
+
+    def show_interactions():
+        interactions_df = pd.DataFrame(result['drug_interactions'])
+        st.dataframe(interactions_df, use_container_width=True)
+
+    render_on_demand("Show drug interactions", show_interactions, key="show_interactions")
 
     st.subheader("⚠ Special Population Warnings")
-    warnings_df = pd.DataFrame(result['special_population_warnings'])
-    st.dataframe(warnings_df, use_container_width=True)
+
+    def show_warnings():
+        warnings_df = pd.DataFrame(result['special_population_warnings'])
+        st.dataframe(warnings_df, use_container_width=True)
+
+    render_on_demand("Show population warnings", show_warnings, key="show_warnings")
 
     st.subheader("🔄 Alternative Drugs")
-    alternatives_df = pd.DataFrame(result['alternative_drugs'])
-    alternatives_fig = create_alternative_drugs_chart(result['alternative_drugs'])
-    st.plotly_chart(alternatives_fig, use_container_width=True)
-    st.dataframe(alternatives_df, use_container_width=True)
+
+    def show_alternatives():
+        alternatives_df = pd.DataFrame(result['alternative_drugs'])
+        alternatives_fig = create_alternative_drugs_chart(result['alternative_drugs'])
+        st.plotly_chart(alternatives_fig, use_container_width=True)
+        st.dataframe(alternatives_df, use_container_width=True)
+
+    render_on_demand("Show alternative drugs", show_alternatives, key="show_alternatives")
 
     st.subheader("📝 Clinical Summary")
     st.info(result['summary'])
 
     # Download button
-    st.download_button(
-        "📥 Download Full Risk Assessment Report",
-        data=json.dumps(result, indent=2),
-        file_name="risk_assessment_report.json",
-        mime="application/json",
-        use_container_width=True
-    )
+    def show_report_download():
+        # Serialize once per result rather than on every rerun
+        report = st.session_state.get("report_json")
+        if report is None or report[0] is not result:
+            report = st.session_state.report_json = (result, json.dumps(result, indent=2))
+        st.download_button(
+            "📥 Download Full Risk Assessment Report",
+            data=report[1],
+            file_name="risk_assessment_report.json",
+            mime="application/json",
+            use_container_width=True
+        )
+
+    render_on_demand("Prepare full report download", show_report_download, key="show_report_download")
 
 else:
     # Welcome/instructions when no analysis has been done yet - FIXED WHITE TEXT ISSUE
@@ -0,0 +1,266 @@
+"""Microbenchmark of figure-build time per chart type.
+
+"before" times the original from-scratch builders, kept verbatim below so the
+comparison stays honest as charts.py evolves. "after" reuses the per-process
+skeleton from charts.py and only fills in the data arrays.
+
+Usage: python bench_charts.py [--repeat N]
+"""
+import argparse
+import time
+
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+import charts
+
+SAMPLE_PATIENT = {
+    "bp_systolic": 138,
+    "bp_diastolic": 82,
+    "total_chol": 245,
+    "ldl": 165,
+    "hdl": 38,
+    "trig": 210,
+    "egfr": 45,
+    "current_medications": [{"name": name} for name in ["Metformin", "Aspirin", "Lisinopril", "Omeprazole"]],
+}
+SAMPLE_RISK_BREAKDOWN = {
+    "systemic_risks": [{"system": system, "risk_percent": pct}
+                       for system, pct in [("Hepatic", 3), ("Renal", 7), ("Muscular", 5), ("Cardiac", 2)]],
+}
+SAMPLE_COMORBIDITY_IMPACT = [
+    {"comorbidity_description": desc, "risk_change_percent": pct}
+    for desc, pct in [("Type 2 diabetes", 4), ("CKD stage 3", 8), ("Hypertension", 2)]
+]
+SAMPLE_ALTERNATIVES = [
+    {"name": name, "predicted_risk_percent": pct}
+    for name, pct in [("Atorvastatin", 35), ("Pravastatin", 22), ("Ezetimibe", 18)]
+]
+
+
+# --------------------
+# BASELINE BUILDERS (pre-template implementation from app.py, copied unchanged;
+# the gauge was built inline in the results section)
+# --------------------
+def baseline_patient_summary_charts(patient_data):
+    """Create charts for patient summary"""
+    # Create subplots
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Blood Pressure', 'Lipid Profile', 'Kidney Function', 'Medications'),
+        specs=[[{"type": "indicator"}, {"type": "bar"}],
+               [{"type": "indicator"}, {"type": "pie"}]]
+    )
+    
+    # Blood Pressure indicator
+    fig.add_trace(go.Indicator(
+        mode = "number+gauge", 
+        value = patient_data["bp_systolic"],
+        number = {"suffix": "/" + str(patient_data["bp_diastolic"]) + " mmHg"},
+        domain = {'x': [0.25, 0.75], 'y': [0.7, 0.9]},
+        gauge = {
+            'shape': "bullet",
+            'axis': {'range': [80, 200]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [80, 120], 'color': "lightgreen"},
+                {'range': [120, 140], 'color': "yellow"},
+                {'range': [140, 200], 'color': "red"}
+            ]
+        }
+    ), row=1, col=1)
+    
+    # Lipid Profile bar chart
+    lipids = ['Total Cholesterol', 'LDL', 'HDL', 'Triglycerides']
+    values = [patient_data["total_chol"], patient_data["ldl"], patient_data["hdl"], patient_data["trig"]]
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+    
+    fig.add_trace(go.Bar(
+        x=lipids,
+        y=values,
+        marker_color=colors,
+        text=values,
+        textposition='auto',
+    ), row=1, col=2)
+    
+    # Kidney Function indicator
+    fig.add_trace(go.Indicator(
+        mode = "number+gauge", 
+        value = patient_data["egfr"],
+        number = {"suffix": " mL/min"},
+        domain = {'x': [0.25, 0.75], 'y': [0.1, 0.3]},
+        gauge = {
+            'shape': "bullet",
+            'axis': {'range': [0, 120]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [90, 120], 'color': "lightgreen"},
+                {'range': [60, 90], 'color': "yellow"},
+                {'range': [30, 60], 'color': "orange"},
+                {'range': [0, 30], 'color': "red"}
+            ]
+        }
+    ), row=2, col=1)
+    
+    # Medications pie chart
+    med_names = [med["name"] for med in patient_data["current_medications"]]
+    med_counts = [1] * len(med_names)  # Simple count for pie chart
+    
+    fig.add_trace(go.Pie(
+        labels=med_names,
+        values=med_counts,
+        hole=.4,
+        textinfo='label+percent',
+        insidetextorientation='radial'
+    ), row=2, col=2)
+    
+    fig.update_layout(height=600, showlegend=False, title_text="Patient Health Summary", title_x=0.5)
+    return fig
+
+def baseline_risk_breakdown_chart(risk_breakdown):
+    """Create a radar chart for risk breakdown"""
+    categories = [risk['system'] for risk in risk_breakdown['systemic_risks']]
+    values = [risk['risk_percent'] for risk in risk_breakdown['systemic_risks']]
+    
+    fig = go.Figure(data=go.Scatterpolar(
+        r=values + [values[0]],  # Close the circle
+        theta=categories + [categories[0]],  # Close the circle
+        fill='toself',
+        line=dict(color='#1f77b4'),
+        name="Risk Levels"
+    ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 10]
+            )),
+        showlegend=False,
+        title="Risk Breakdown by Category",
+        title_x=0.5
+    )
+    
+    return fig
+
+def baseline_comorbidity_impact_chart(comorbidity_impact):
+    """Create a bar chart for comorbidity impact"""
+    comorbidities = [comorbidity['comorbidity_description'] for comorbidity in comorbidity_impact]
+    impacts = [comorbidity['risk_change_percent'] for comorbidity in comorbidity_impact]
+    
+    # Color based on impact level
+    colors = []
+    for impact in impacts:
+        if impact >= 7:
+            colors.append('#dc3545')  # High risk - red
+        elif impact >= 4:
+            colors.append('#ffc107')  # Medium risk - yellow
+        else:
+            colors.append('#28a745')  # Low risk - green
+    
+    fig = go.Figure(data=[go.Bar(
+        x=comorbidities,
+        y=impacts,
+        marker_color=colors,
+        text=impacts,
+        textposition='auto',
+    )])
+    
+    fig.update_layout(
+        title="Comorbidity Impact on Drug Risk",
+        xaxis_title="Comorbidities",
+        yaxis_title="Impact Level",
+        yaxis=dict(range=[0, 10]),
+        title_x=0.5
+    )
+    
+    return fig
+
+def baseline_alternative_drugs_chart(alternative_drugs):
+    """Create a comparison chart for alternative drugs"""
+    drugs = [drug['name'] for drug in alternative_drugs]
+    risk = [drug['predicted_risk_percent'] for drug in alternative_drugs]
+    
+    fig = go.Figure(data=[
+        go.Bar(name='Risk score', x=drugs, y=risk, marker_color='#2ca02c')
+    ])
+    
+    fig.update_layout(
+        barmode='group',
+        title="Alternative Drugs: Efficacy vs Safety",
+        xaxis_title="Drugs",
+        yaxis_title="Score",
+        yaxis=dict(range=[0, 100]),
+        title_x=1
+    )
+    
+    return fig
+
+def baseline_risk_gauge_chart(risk_score, risk_color):
+    """Create the overall risk gauge"""
+    gauge_fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = risk_score,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Overall Risk Score", 'font': {'size': 24}},
+        gauge = {
+            'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'bar': {'color': risk_color},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [0, 30], 'color': '#28a745'},
+                {'range': [30, 70], 'color': '#ffc107'},
+                {'range': [70, 100], 'color': '#dc3545'}],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': risk_score}}))
+    
+    gauge_fig.update_layout(height=300)
+    return gauge_fig
+
+
+CASES = [
+    ("patient_summary",
+     lambda: baseline_patient_summary_charts(SAMPLE_PATIENT),
+     lambda: charts.create_patient_summary_charts(SAMPLE_PATIENT)),
+    ("risk_gauge",
+     lambda: baseline_risk_gauge_chart(45, "#ffc107"),
+     lambda: charts.create_risk_gauge_chart(45, "#ffc107")),
+    ("risk_breakdown",
+     lambda: baseline_risk_breakdown_chart(SAMPLE_RISK_BREAKDOWN),
+     lambda: charts.create_risk_breakdown_chart(SAMPLE_RISK_BREAKDOWN)),
+    ("comorbidity_impact",
+     lambda: baseline_comorbidity_impact_chart(SAMPLE_COMORBIDITY_IMPACT),
+     lambda: charts.create_comorbidity_impact_chart(SAMPLE_COMORBIDITY_IMPACT)),
+    ("alternative_drugs",
+     lambda: baseline_alternative_drugs_chart(SAMPLE_ALTERNATIVES),
+     lambda: charts.create_alternative_drugs_chart(SAMPLE_ALTERNATIVES)),
+]
+
+
+def time_ms(fn, repeat):
+    """Mean wall time of fn() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="builds per chart and mode")
+    args = parser.parse_args()
+
+    print(f"{'chart':<20}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name, baseline, build in CASES:
+        before = time_ms(baseline, args.repeat)
+        build()  # warm the skeleton
+        after = time_ms(build, args.repeat)
+        print(f"{name:<20}{before:>14.2f}{after:>14.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark of the shared store scaling from 1 to N worker processes.
+
+Each worker process stands in for one Streamlit replica: it serves a stream of
+assessment requests drawn from a small pool of distinct patients, calling a
+fake backend with fixed latency on every cache miss. "none" calls the backend
+for every request, as a deployment without the shared tier does; "shared"
+goes through one SharedStore database used by all workers.
+
+Usage: python bench_store.py [--workers 1 2 4 8] [--requests 40] [--patients 20] [--latency-ms 50]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+
+from store import SharedStore
+
+
+def fake_backend(payload, latency_s, calls):
+    """Stand-in for the risk assessment backend"""
+    calls.append(payload)
+    time.sleep(latency_s)
+    return {"overall_risk": {"score_percent": payload["patient_id"] % 100}}
+
+
+def worker(mode, db_path, seed, args):
+    """Serve args.requests requests; return (backend calls, store stats)"""
+    rng = random.Random(seed)
+    calls = []
+    store = SharedStore(db_path) if mode == "shared" else None
+    latency_s = args.latency_ms / 1000
+    for _ in range(args.requests):
+        payload = {"patient_id": rng.randrange(args.patients)}
+        if store:
+            store.get_or_compute(payload, lambda: fake_backend(payload, latency_s, calls))
+        else:
+            fake_backend(payload, latency_s, calls)
+    return len(calls), store.stats.as_dict() if store else {}
+
+
+def run(mode, workers, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "shared.db")
+        if mode == "shared":
+            SharedStore(db_path)  # create the schema before workers race for it
+        start = time.perf_counter()
+        with mp.Pool(workers) as pool:
+            outcomes = pool.starmap(worker, [(mode, db_path, seed, args) for seed in range(workers)])
+        elapsed = time.perf_counter() - start
+
+    backend_calls = sum(calls for calls, _ in outcomes)
+    stats = [s for _, s in outcomes]
+    totals = {key: sum(s.get(key, 0) for s in stats)
+              for key in ("hits", "cross_process_hits", "misses", "lock_acquires", "lock_contended", "lock_wait_s")}
+    lookups = totals["hits"] + totals["misses"]
+    return {
+        "elapsed": elapsed,
+        "throughput": workers * args.requests / elapsed,
+        "backend_calls": backend_calls,
+        "hit_rate": totals["hits"] / lookups if lookups else 0.0,
+        "cross_hit_rate": totals["cross_process_hits"] / totals["hits"] if totals["hits"] else 0.0,
+        "contended": totals["lock_contended"] / totals["lock_acquires"] if totals["lock_acquires"] else 0.0,
+        "lock_wait_ms": totals["lock_wait_s"] / totals["lock_acquires"] * 1000 if totals["lock_acquires"] else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=40, help="requests per worker")
+    parser.add_argument("--patients", type=int, default=20, help="distinct payloads shared by all workers")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake backend latency")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'workers':>8}{'req/s':>9}{'backend':>9}{'hit':>7}{'x-proc':>8}"
+          f"{'contended':>11}{'lock ms':>9}")
+    for workers in args.workers:
+        for mode in ("none", "shared"):
+            r = run(mode, workers, args)
+            print(f"{mode:<8}{workers:>8}{r['throughput']:>9.1f}{r['backend_calls']:>9}"
+                  f"{r['hit_rate']:>7.0%}{r['cross_hit_rate']:>8.0%}{r['contended']:>11.0%}{r['lock_wait_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
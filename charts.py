@@ -0,0 +1,248 @@
+"""Plotly chart builders for the patient risk dashboard.
+
+Layout, gauge steps, colours and subplot grids are built and validated once
+per process as figure skeletons; each patient's chart is produced by copying
+a skeleton and filling in only its data arrays.
+"""
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Comorbidity impact colour bins: < 4 low (green), < 7 medium (yellow), else high (red)
+IMPACT_BIN_EDGES = [4, 7]
+IMPACT_COLORS = np.array(['#28a745', '#ffc107', '#dc3545'])
+
+
+def _from_template(template, data):
+    """Create a figure from a skeleton dict with per-patient trace data.
+
+    The skeleton was validated when it was built, so the copy skips Plotly's
+    property validation - this is what makes the per-patient build cheap.
+    go.Figure copies its input, so the shared skeleton is never mutated.
+    """
+    return go.Figure({"data": data, "layout": template["layout"]}, _validate=False)
+
+
+# --------------------
+# FIGURE SKELETONS (built once per process)
+# --------------------
+@lru_cache(maxsize=None)
+def patient_summary_template():
+    """Subplot grid, gauges and styling for the patient summary"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Blood Pressure', 'Lipid Profile', 'Kidney Function', 'Medications'),
+        specs=[[{"type": "indicator"}, {"type": "bar"}],
+               [{"type": "indicator"}, {"type": "pie"}]]
+    )
+
+    # Blood Pressure indicator
+    fig.add_trace(go.Indicator(
+        mode = "number+gauge",
+        value = 0,
+        number = {"suffix": " mmHg"},
+        domain = {'x': [0.25, 0.75], 'y': [0.7, 0.9]},
+        gauge = {
+            'shape': "bullet",
+            'axis': {'range': [80, 200]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [80, 120], 'color': "lightgreen"},
+                {'range': [120, 140], 'color': "yellow"},
+                {'range': [140, 200], 'color': "red"}
+            ]
+        }
+    ), row=1, col=1)
+
+    # Lipid Profile bar chart
+    fig.add_trace(go.Bar(
+        x=['Total Cholesterol', 'LDL', 'HDL', 'Triglycerides'],
+        y=[0, 0, 0, 0],
+        marker_color=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728'],
+        textposition='auto',
+    ), row=1, col=2)
+
+    # Kidney Function indicator
+    fig.add_trace(go.Indicator(
+        mode = "number+gauge",
+        value = 0,
+        number = {"suffix": " mL/min"},
+        domain = {'x': [0.25, 0.75], 'y': [0.1, 0.3]},
+        gauge = {
+            'shape': "bullet",
+            'axis': {'range': [0, 120]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [90, 120], 'color': "lightgreen"},
+                {'range': [60, 90], 'color': "yellow"},
+                {'range': [30, 60], 'color': "orange"},
+                {'range': [0, 30], 'color': "red"}
+            ]
+        }
+    ), row=2, col=1)
+
+    # Medications pie chart
+    fig.add_trace(go.Pie(
+        hole=.4,
+        textinfo='label+percent',
+        insidetextorientation='radial'
+    ), row=2, col=2)
+
+    fig.update_layout(height=600, showlegend=False, title_text="Patient Health Summary", title_x=0.5)
+    return fig.to_dict()
+
+@lru_cache(maxsize=None)
+def risk_gauge_template():
+    """Axis, bands and styling for the overall risk gauge"""
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = 0,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Overall Risk Score", 'font': {'size': 24}},
+        gauge = {
+            'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'bar': {'color': "darkblue"},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [0, 30], 'color': '#28a745'},
+                {'range': [30, 70], 'color': '#ffc107'},
+                {'range': [70, 100], 'color': '#dc3545'}],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 0}}))
+
+    fig.update_layout(height=300)
+    return fig.to_dict()
+
+@lru_cache(maxsize=None)
+def risk_breakdown_template():
+    """Polar axes and styling for the risk radar"""
+    fig = go.Figure(data=go.Scatterpolar(
+        fill='toself',
+        line=dict(color='#1f77b4'),
+        name="Risk Levels"
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 10]
+            )),
+        showlegend=False,
+        title="Risk Breakdown by Category",
+        title_x=0.5
+    )
+    return fig.to_dict()
+
+@lru_cache(maxsize=None)
+def comorbidity_impact_template():
+    """Axes and styling for the comorbidity impact bar chart"""
+    fig = go.Figure(data=[go.Bar(textposition='auto')])
+
+    fig.update_layout(
+        title="Comorbidity Impact on Drug Risk",
+        xaxis_title="Comorbidities",
+        yaxis_title="Impact Level",
+        yaxis=dict(range=[0, 10]),
+        title_x=0.5
+    )
+    return fig.to_dict()
+
+@lru_cache(maxsize=None)
+def alternative_drugs_template():
+    """Axes and styling for the alternative drugs comparison"""
+    fig = go.Figure(data=[
+        go.Bar(name='Risk score', marker_color='#2ca02c')
+    ])
+
+    fig.update_layout(
+        barmode='group',
+        title="Alternative Drugs: Efficacy vs Safety",
+        xaxis_title="Drugs",
+        yaxis_title="Score",
+        yaxis=dict(range=[0, 100]),
+        title_x=1
+    )
+    return fig.to_dict()
+
+# --------------------
+# PER-PATIENT CHARTS
+# --------------------
+def create_patient_summary_charts(patient_data):
+    """Create charts for patient summary"""
+    template = patient_summary_template()
+    bp, lipids, kidney, meds = template["data"]
+
+    lipid_values = [patient_data["total_chol"], patient_data["ldl"], patient_data["hdl"], patient_data["trig"]]
+    med_names = [med["name"] for med in patient_data["current_medications"]]
+
+    return _from_template(template, [
+        {**bp, "value": patient_data["bp_systolic"],
+         "number": {"suffix": "/" + str(patient_data["bp_diastolic"]) + " mmHg"}},
+        {**lipids, "y": lipid_values, "text": [str(v) for v in lipid_values]},
+        {**kidney, "value": patient_data["egfr"]},
+        {**meds, "labels": med_names, "values": [1] * len(med_names)},  # Simple count for pie chart
+    ])
+
+def create_risk_gauge_chart(risk_score, risk_color):
+    """Create the overall risk gauge"""
+    template = risk_gauge_template()
+    (indicator,) = template["data"]
+    gauge = indicator["gauge"]
+
+    return _from_template(template, [{
+        **indicator,
+        "value": risk_score,
+        "gauge": {**gauge,
+                  "bar": {**gauge["bar"], "color": risk_color},
+                  "threshold": {**gauge["threshold"], "value": risk_score}},
+    }])
+
+def create_risk_breakdown_chart(risk_breakdown):
+    """Create a radar chart for risk breakdown"""
+    categories = [risk['system'] for risk in risk_breakdown['systemic_risks']]
+    values = [risk['risk_percent'] for risk in risk_breakdown['systemic_risks']]
+
+    template = risk_breakdown_template()
+    (radar,) = template["data"]
+
+    return _from_template(template, [{
+        **radar,
+        "r": values + [values[0]],  # Close the circle
+        "theta": categories + [categories[0]],  # Close the circle
+    }])
+
+def create_comorbidity_impact_chart(comorbidity_impact):
+    """Create a bar chart for comorbidity impact"""
+    comorbidities = [comorbidity['comorbidity_description'] for comorbidity in comorbidity_impact]
+    impacts = [comorbidity['risk_change_percent'] for comorbidity in comorbidity_impact]
+
+    # Color based on impact level
+    colors = IMPACT_COLORS[np.digitize(impacts, IMPACT_BIN_EDGES)].tolist()
+
+    template = comorbidity_impact_template()
+    (bars,) = template["data"]
+
+    return _from_template(template, [{
+        **bars,
+        "x": comorbidities,
+        "y": impacts,
+        "text": [str(v) for v in impacts],
+        "marker": {"color": colors},
+    }])
+
+def create_alternative_drugs_chart(alternative_drugs):
+    """Create a comparison chart for alternative drugs"""
+    drugs = [drug['name'] for drug in alternative_drugs]
+    risk = [drug['predicted_risk_percent'] for drug in alternative_drugs]
+
+    template = alternative_drugs_template()
+    (bars,) = template["data"]
+
+    return _from_template(template, [{**bars, "x": drugs, "y": risk}])
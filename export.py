@@ -0,0 +1,304 @@
+"""Bulk export of risk assessments to Parquet/CSV tables and per-patient PDFs.
+
+Assessments are read from an iterator factory in fixed-size chunks, so memory
+stays bounded by the chunk size rather than the number of assessments. The
+first pass only collects column names and value types, the second pass writes
+rows; both are cheap to repeat from session history or the shared store. Both
+passes must see the same assessments - a row that does not fit the pass-1
+schema raises SchemaMismatch rather than being truncated or dropped.
+
+Finished artifacts live in the system temp directory; sweep_exports() deletes
+ones older than EXPORT_MAX_AGE_S and runs before every new export.
+"""
+import csv
+import json
+import os
+import tempfile
+import textwrap
+import time
+import zipfile
+from datetime import datetime
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CHUNK_SIZE = 200
+EXPORT_PREFIX = "risk_assessments_"
+EXPORT_MAX_AGE_S = 3600
+
+
+class SchemaMismatch(ValueError):
+    """A row does not fit the schema collected in the first export pass"""
+
+# Output table -> function returning the rows one assessment contributes
+TABLES = {
+    "assessments": lambda result: [{
+        "overall_risk": result.get("overall_risk", {}),
+        "summary": result.get("summary"),
+    }],
+    "systemic_risks": lambda result: result.get("risk_breakdown", {}).get("systemic_risks", []),
+    "comorbidity_impact": lambda result: result.get("risk_breakdown", {}).get("comorbidity_impact", []),
+    "drug_interactions": lambda result: result.get("drug_interactions", []),
+    "alternative_drugs": lambda result: result.get("alternative_drugs", []),
+}
+
+
+def _flatten(record, prefix=""):
+    """Flatten nested dicts into dotted column names"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def _table_rows(table, assessment):
+    assessment_id, created_at, result = assessment
+    keys = {"assessment_id": assessment_id}
+    if table == "assessments":
+        keys["created_at"] = datetime.fromtimestamp(created_at).isoformat(timespec="seconds")
+    return [{**keys, **_flatten(row)} for row in TABLES[table](result)]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# --------------------
+# Column schema
+# --------------------
+def _arrow_type(kinds):
+    """Arrow type for a column from the Python types seen in it"""
+    if kinds == {bool}:
+        return pa.bool_()
+    if kinds and kinds <= {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def _collect_schemas(iter_assessments, chunk_size):
+    """First pass: column names (in first-seen order) and types for every table"""
+    kinds = {table: {} for table in TABLES}
+    for chunk in _chunks(iter_assessments(), chunk_size):
+        for assessment in chunk:
+            for table, columns in kinds.items():
+                for row in _table_rows(table, assessment):
+                    for column, value in row.items():
+                        seen = columns.setdefault(column, set())
+                        if value is not None:
+                            seen.add(type(value))
+    return {
+        table: pa.schema([("assessment_id", pa.string())] + [
+            (column, _arrow_type(seen)) for column, seen in columns.items() if column != "assessment_id"
+        ])
+        for table, columns in kinds.items()
+    }
+
+
+# Python types each non-string Arrow column accepts without losing information
+_FITTING_TYPES = {
+    pa.bool_(): {bool},
+    pa.int64(): {int},
+    pa.float64(): {int, float},
+}
+
+
+def _coerce(row, schema):
+    """Fit a row to the schema, serializing lists, dicts and numbers in string columns.
+
+    Raises SchemaMismatch for unknown columns or values the column type
+    cannot hold, e.g. 40.5 in an int64 column.
+    """
+    unknown = row.keys() - set(schema.names)
+    if unknown:
+        raise SchemaMismatch(f"columns not seen in the first pass: {sorted(unknown)}")
+    coerced = {}
+    for field in schema:
+        value = row.get(field.name)
+        if value is not None:
+            if field.type == pa.string():
+                if not isinstance(value, str):
+                    value = json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+            elif type(value) not in _FITTING_TYPES[field.type]:
+                raise SchemaMismatch(f"{field.name}={value!r} does not fit column type {field.type}")
+        coerced[field.name] = value
+    return coerced
+
+
+# --------------------
+# Table writers
+# --------------------
+class _ParquetSink:
+    """Writes each chunk as one Parquet row group"""
+    extension = "parquet"
+
+    def __init__(self, path, schema):
+        self.schema = schema
+        self.writer = pq.ParquetWriter(path, schema)
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class _CsvSink:
+    """Appends each chunk to a CSV file with a fixed header"""
+    extension = "csv"
+
+    def __init__(self, path, schema):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=schema.names)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+SINKS = {"parquet": _ParquetSink, "csv": _CsvSink}
+
+
+# --------------------
+# PDF summaries
+# --------------------
+PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT = 612, 792  # US Letter in points
+PDF_MARGIN, PDF_FONT_SIZE, PDF_LEADING = 50, 10, 14
+PDF_WRAP = 95
+PDF_LINES_PER_PAGE = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+PDF_ENCODING = "cp1252"  # bytes of the Helvetica /WinAnsiEncoding
+
+
+def _pdf_text(text):
+    """Escape text for a PDF string literal; characters outside WinAnsi become '?'"""
+    text = text.encode(PDF_ENCODING, errors="replace").decode(PDF_ENCODING)
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_document(lines):
+    """Render plain text lines as a minimal multi-page PDF"""
+    wrapped = [part for line in lines for part in (textwrap.wrap(line, PDF_WRAP) or [""])]
+    pages = [wrapped[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(wrapped), PDF_LINES_PER_PAGE)] or [[]]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and content stream per page
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for page_id, page in zip(page_ids, pages):
+        text = "".join(f"({_pdf_text(line)}) Tj T* " for line in page)
+        stream = (f"BT /F1 {PDF_FONT_SIZE} Tf {PDF_LEADING} TL "
+                  f"{PDF_MARGIN} {PDF_PAGE_HEIGHT - PDF_MARGIN} Td {text}ET")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PDF_PAGE_WIDTH} {PDF_PAGE_HEIGHT}] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>")
+        objects.append(f"<< /Length {len(stream.encode(PDF_ENCODING))} >>\nstream\n{stream}\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode(PDF_ENCODING)
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode(PDF_ENCODING)
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode(PDF_ENCODING)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode(PDF_ENCODING)
+    return bytes(out)
+
+
+def _describe(row):
+    return ", ".join(f"{key}: {value}" for key, value in _flatten(row).items())
+
+
+def assessment_pdf(assessment):
+    """Per-patient PDF summary of one assessment"""
+    assessment_id, created_at, result = assessment
+    overall = result.get("overall_risk", {})
+    breakdown = result.get("risk_breakdown", {})
+    lines = [
+        "Patient Drug Risk Assessment",
+        f"Assessment {assessment_id} - {datetime.fromtimestamp(created_at):%Y-%m-%d %H:%M}",
+        "",
+        f"Overall risk: {overall.get('score_percent')}% ({overall.get('category')})",
+        f"Interpretation: {overall.get('interpretation', '')}",
+        f"Detailed analysis: {overall.get('description', '')}",
+    ]
+    sections = [
+        ("Systemic risks", breakdown.get("systemic_risks", [])),
+        ("Comorbidity impact", breakdown.get("comorbidity_impact", [])),
+        ("Drug interactions", result.get("drug_interactions", [])),
+        ("Special population warnings", result.get("special_population_warnings", [])),
+        ("Alternative drugs", result.get("alternative_drugs", [])),
+    ]
+    for title, rows in sections:
+        lines += ["", title] + [f"- {_describe(row)}" for row in rows] + ([] if rows else ["- none"])
+    lines += ["", "Clinical summary", result.get("summary", "")]
+    return _pdf_document(lines)
+
+
+# --------------------
+# Export entry point
+# --------------------
+def sweep_exports(max_age_s=EXPORT_MAX_AGE_S):
+    """Delete export artifacts older than max_age_s from the temp directory"""
+    cutoff = time.time() - max_age_s
+    tmp = tempfile.gettempdir()
+    for name in os.listdir(tmp):
+        path = os.path.join(tmp, name)
+        if name.startswith(EXPORT_PREFIX) and name.endswith(".zip"):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass  # removed concurrently by another session's sweep
+
+
+def build_export(iter_assessments, fmt="parquet", include_pdf=False, chunk_size=CHUNK_SIZE):
+    """Write a ZIP of flattened assessment tables (and optional PDFs); return its path.
+
+    iter_assessments is called once per pass and must return a fresh iterator
+    of (assessment_id, created_at, result) tuples. Safe to run off the script
+    thread: it does not touch Streamlit state. The caller owns the returned file.
+    """
+    sweep_exports()
+    sink_cls = SINKS[fmt]
+    schemas = _collect_schemas(iter_assessments, chunk_size)
+
+    fd, zip_path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=".zip")
+    os.close(fd)
+    try:
+        with tempfile.TemporaryDirectory() as tmp, \
+                zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            paths = {table: os.path.join(tmp, f"{table}.{sink_cls.extension}") for table in TABLES}
+            sinks = {table: sink_cls(paths[table], schemas[table]) for table in TABLES}
+            try:
+                for chunk in _chunks(iter_assessments(), chunk_size):
+                    for table, sink in sinks.items():
+                        sink.write([_coerce(row, schemas[table])
+                                    for assessment in chunk for row in _table_rows(table, assessment)])
+                    if include_pdf:
+                        for assessment in chunk:
+                            archive.writestr(f"pdf/{assessment[0]}.pdf", assessment_pdf(assessment))
+            finally:
+                for sink in sinks.values():
+                    sink.close()
+
+            for path in paths.values():
+                archive.write(path, os.path.basename(path))
+    except BaseException:
+        os.remove(zip_path)
+        raise
+    return zip_path
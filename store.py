@@ -0,0 +1,313 @@
+"""Optional shared tier for running several Streamlit worker processes on one host.
+
+All workers point at the same SQLite database (WAL mode) to share backend
+responses, deduplicate in-flight backend calls and keep assessment results
+beyond the lifetime of a single process or session.
+
+Cached responses expire after cache_ttl_s and stored results (which include
+the full patient payload as plaintext JSON) after result_retention_s; expired
+rows are deleted on the next write of the same kind.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    writer_pid INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+"""
+
+# A write lock that takes longer than this to acquire counts as contended
+CONTENDED_LOCK_S = 0.001
+
+
+class BackendCallFailed(RuntimeError):
+    """Another caller's backend request for the same payload failed recently"""
+
+
+def payload_key(payload):
+    """Stable cache key for a backend request payload"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class StoreStats:
+    """Per-process counters for cache effectiveness and lock contention"""
+    hits: int = 0
+    cross_process_hits: int = 0
+    misses: int = 0
+    dedup_waits: int = 0
+    shared_failures: int = 0
+    lock_acquires: int = 0
+    lock_contended: int = 0
+    lock_wait_s: float = 0.0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def cross_process_hit_rate(self):
+        """Share of hits served from a response another process fetched"""
+        return self.cross_process_hits / self.hits if self.hits else 0.0
+
+    @property
+    def mean_lock_wait_ms(self):
+        return self.lock_wait_s / self.lock_acquires * 1000 if self.lock_acquires else 0.0
+
+    def as_dict(self):
+        return {
+            **asdict(self),
+            "hit_rate": self.hit_rate,
+            "cross_process_hit_rate": self.cross_process_hit_rate,
+            "mean_lock_wait_ms": self.mean_lock_wait_ms,
+        }
+
+
+class SharedStore:
+    """SQLite-backed response cache, in-flight job registry and result store.
+
+    Safe to share between threads (one connection per thread) and between
+    processes on the same host (SQLite file locking with WAL journaling).
+    """
+
+    def __init__(self, path, cache_ttl_s=3600, job_timeout_s=120, failure_ttl_s=10,
+                 result_retention_s=30 * 24 * 3600, poll_interval_s=0.05, busy_timeout_s=30):
+        self.path = path
+        self.cache_ttl_s = cache_ttl_s
+        self.job_timeout_s = job_timeout_s
+        self.failure_ttl_s = failure_ttl_s
+        self.result_retention_s = result_retention_s
+        self.poll_interval_s = poll_interval_s
+        self.busy_timeout_s = busy_timeout_s
+        self.pid = os.getpid()
+        self.stats = StoreStats()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with self._write(conn):
+            # executescript() would commit our transaction, so run statements one by one
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+    # --------------------
+    # Connection and locking
+    # --------------------
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_s, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    @contextmanager
+    def _write(self, conn):
+        """Run a write transaction, recording how long the write lock took to get"""
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        waited = time.perf_counter() - start
+        self._count(lock_acquires=1, lock_contended=int(waited > CONTENDED_LOCK_S), lock_wait_s=waited)
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # --------------------
+    # Response cache with in-flight dedup
+    # --------------------
+    def _cached(self, conn, key):
+        return conn.execute(
+            "SELECT response, writer_pid FROM response_cache WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.cache_ttl_s),
+        ).fetchone()
+
+    def _job(self, conn, key, now):
+        """State of the in-flight job for key: "failed" (with error), "running" or None"""
+        row = conn.execute("SELECT started_at, error FROM jobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None
+        started_at, error = row
+        if error is not None:
+            return ("failed", error) if started_at >= now - self.failure_ttl_s else (None, None)
+        return ("running", None) if started_at >= now - self.job_timeout_s else (None, None)
+
+    def _claim(self, conn, key, owner, retry_failed):
+        """Try to claim the backend call for key.
+
+        Returns ("hit", cached), ("failed", error), ("claimed", None) or
+        ("running", None) when another caller already owns it. A recent
+        failure is taken over only if retry_failed is set.
+        """
+        now = time.time()
+        with self._write(conn):
+            cached = self._cached(conn, key)
+            if cached is not None:
+                return "hit", cached
+            state, error = self._job(conn, key, now)
+            if state == "running" or (state == "failed" and not retry_failed):
+                return state, error
+            # Take over failed jobs, and jobs whose owner died or hung past the timeout
+            conn.execute("DELETE FROM jobs WHERE key = ?", (key,))
+            conn.execute("INSERT INTO jobs (key, owner, started_at) VALUES (?, ?, ?)", (key, owner, now))
+        return "claimed", None
+
+    def _hit(self, cached):
+        response, writer_pid = cached
+        self._count(hits=1, cross_process_hits=int(writer_pid != self.pid))
+        return json.loads(response)
+
+    def _failed(self, error):
+        self._count(shared_failures=1)
+        raise BackendCallFailed(f"Backend call failed for an identical request: {error}")
+
+    def get_or_compute(self, payload, compute):
+        """Return the cached response for payload, calling compute() at most once across processes.
+
+        If another process is already fetching the same payload, wait for its
+        response instead of issuing a duplicate backend call. If that call
+        fails, every waiter raises BackendCallFailed at once rather than
+        retrying the backend in turn. A new call for the same payload, e.g. the
+        user pressing Analyze again, retries the backend.
+        """
+        conn = self._connection()
+        key = payload_key(payload)
+        owner = uuid.uuid4().hex
+        waited = False
+        while True:
+            cached = self._cached(conn, key)
+            if cached is not None:
+                return self._hit(cached)
+            state, error = self._job(conn, key, time.time())
+            # Only callers that waited on the failed call fail fast; new ones retry
+            if state is None or (state == "failed" and not waited):
+                state, result = self._claim(conn, key, owner, retry_failed=not waited)
+                if state == "hit":
+                    return self._hit(result)
+                error = result
+            if state == "failed":
+                self._failed(error)
+            if state == "claimed":
+                break
+            if not waited:
+                self._count(dedup_waits=1)
+                waited = True
+            time.sleep(self.poll_interval_s)
+
+        self._count(misses=1)
+        try:
+            response = compute()
+        except BaseException as exc:
+            # Leave the failure behind so concurrent waiters fail fast
+            with self._write(conn):
+                conn.execute(
+                    "UPDATE jobs SET error = ?, started_at = ? WHERE key = ? AND owner = ?",
+                    (f"{type(exc).__name__}: {exc}", time.time(), key, owner),
+                )
+            raise
+
+        now = time.time()
+        with self._write(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, response, writer_pid, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), self.pid, now),
+            )
+            conn.execute("DELETE FROM jobs WHERE key = ?", (key,))
+            conn.execute("DELETE FROM response_cache WHERE created_at < ?", (now - self.cache_ttl_s,))
+        return response
+
+    # --------------------
+    # Stored results
+    # --------------------
+    def save_result(self, payload, result):
+        """Persist an assessment and return its id; drops results past the retention period"""
+        conn = self._connection()
+        result_id = uuid.uuid4().hex
+        now = time.time()
+        with self._write(conn):
+            conn.execute(
+                "INSERT INTO results (id, key, created_at, payload, result) VALUES (?, ?, ?, ?, ?)",
+                (result_id, payload_key(payload), now, json.dumps(payload, default=str), json.dumps(result)),
+            )
+            conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.result_retention_s,))
+        return result_id
+
+    def latest_result(self):
+        """(created_at, id) of the newest stored result, or None if there are none"""
+        return self._connection().execute(
+            "SELECT created_at, id FROM results ORDER BY created_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+
+    def iter_results(self, page_size=200, after=(0.0, ""), until=None):
+        """Yield (id, created_at, result) for stored assessments, oldest first, a page at a time.
+
+        Only rows whose (created_at, id) is greater than after and at most
+        until are returned. Pass latest_result() as until to read the same
+        rows on every call while other workers keep saving results.
+        """
+        conn = self._connection()
+        while True:
+            if until is None:
+                rows = conn.execute(
+                    "SELECT id, created_at, result FROM results WHERE (created_at, id) > (?, ?) "
+                    "ORDER BY created_at, id LIMIT ?",
+                    (*after, page_size),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT id, created_at, result FROM results "
+                    "WHERE (created_at, id) > (?, ?) AND (created_at, id) <= (?, ?) "
+                    "ORDER BY created_at, id LIMIT ?",
+                    (*after, *until, page_size),
+                ).fetchall()
+            if not rows:
+                return
+            for result_id, created_at, result in rows:
+                yield result_id, created_at, json.loads(result)
+            after = (rows[-1][1], rows[-1][0])
+
+    def load_result(self, result_id):
+        """Return (payload, created_at, result) for a stored assessment, or None if unknown"""
+        row = self._connection().execute(
+            "SELECT payload, created_at, result FROM results WHERE id = ?", (result_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        payload, created_at, result = row
+        return json.loads(payload), created_at, json.loads(result)
@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+import requests
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+RESULT = {
+    "overall_risk": {"score_percent": 45, "category": "moderate", "interpretation": "", "description": ""},
+    "risk_breakdown": {"systemic_risks": [{"system": "Hepatic", "risk_percent": 3}], "comorbidity_impact": []},
+    "drug_interactions": [],
+    "special_population_warnings": [],
+    "alternative_drugs": [],
+    "summary": "",
+}
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return RESULT
+
+
+@pytest.fixture
+def app(tmp_path):
+    st.cache_resource.clear()  # get_shared_store() must pick up this test's database
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.secrets["BACKEND_URL"] = "http://backend"
+    at.secrets["API_KEY"] = "key"
+    at.secrets["SHARED_STORE_PATH"] = str(tmp_path / "shared.db")
+    yield at
+    st.cache_resource.clear()
+
+
+def analyze(at):
+    next(b for b in at.sidebar.button if b.label == "🔍 Analyze Risk").click().run()
+
+
+def test_failed_analysis_does_not_restore_previous_result(app, monkeypatch):
+    monkeypatch.setattr(requests, "post", lambda *args, **kwargs: FakeResponse())
+    app.run()
+    analyze(app)
+    assert app.session_state["analysis_results"] == RESULT
+    assert "assessment" in app.query_params
+
+    def backend_down(*args, **kwargs):
+        raise requests.ConnectionError("backend down")
+
+    monkeypatch.setattr(requests, "post", backend_down)
+    app.sidebar.number_input[0].set_value(70)  # a different payload, so not a cache hit
+    analyze(app)
+    assert app.session_state["analysis_results"] is None
+    assert "assessment" not in app.query_params
+
+    app.run()
+    assert app.session_state["analysis_results"] is None
+
+
+def test_report_download_is_built_on_demand(app, monkeypatch):
+    monkeypatch.setattr(requests, "post", lambda *args, **kwargs: FakeResponse())
+    app.run()
+    analyze(app)
+    assert "report_json" not in app.session_state
+
+    app.toggle(key="show_report_download").set_value(True).run()
+    _, report = app.session_state["report_json"]
+    assert json.loads(report) == RESULT
+
+    app.run()
+    assert app.session_state["report_json"][1] is report
@@ -0,0 +1,63 @@
+import copy
+import json
+
+import plotly.io as pio
+import pytest
+
+import charts
+from bench_charts import (
+    SAMPLE_ALTERNATIVES,
+    SAMPLE_COMORBIDITY_IMPACT,
+    SAMPLE_PATIENT,
+    SAMPLE_RISK_BREAKDOWN,
+    baseline_alternative_drugs_chart,
+    baseline_comorbidity_impact_chart,
+    baseline_patient_summary_charts,
+    baseline_risk_breakdown_chart,
+    baseline_risk_gauge_chart,
+)
+
+# Impacts on and around the colour bin edges
+COMORBIDITY_EDGES = [
+    {"comorbidity_description": f"c{i}", "risk_change_percent": pct}
+    for i, pct in enumerate([0, 3.9, 4, 6.99, 7, 10])
+]
+
+CASES = [
+    (charts.patient_summary_template, charts.create_patient_summary_charts,
+     baseline_patient_summary_charts, (SAMPLE_PATIENT,)),
+    (charts.risk_gauge_template, charts.create_risk_gauge_chart,
+     baseline_risk_gauge_chart, (45, "#ffc107")),
+    (charts.risk_breakdown_template, charts.create_risk_breakdown_chart,
+     baseline_risk_breakdown_chart, (SAMPLE_RISK_BREAKDOWN,)),
+    (charts.comorbidity_impact_template, charts.create_comorbidity_impact_chart,
+     baseline_comorbidity_impact_chart, (SAMPLE_COMORBIDITY_IMPACT,)),
+    (charts.comorbidity_impact_template, charts.create_comorbidity_impact_chart,
+     baseline_comorbidity_impact_chart, (COMORBIDITY_EDGES,)),
+    (charts.alternative_drugs_template, charts.create_alternative_drugs_chart,
+     baseline_alternative_drugs_chart, (SAMPLE_ALTERNATIVES,)),
+]
+IDS = ["patient_summary", "risk_gauge", "risk_breakdown", "comorbidity_impact",
+       "comorbidity_bin_edges", "alternative_drugs"]
+
+
+def as_json(fig):
+    return json.loads(pio.to_json(fig))
+
+
+@pytest.mark.parametrize("template, create, baseline, args", CASES, ids=IDS)
+def test_matches_baseline_builder(template, create, baseline, args):
+    assert as_json(create(*args)) == as_json(baseline(*args))
+
+
+@pytest.mark.parametrize("template, create, baseline, args", CASES, ids=IDS)
+def test_editing_a_figure_leaves_the_template_unchanged(template, create, baseline, args):
+    before = copy.deepcopy(template())
+
+    fig = create(*args)
+    fig.update_layout(height=123, title_text="edited", title_font_size=30, yaxis_range=[5, 6])
+    fig.update_traces(name="edited", visible="legendonly")
+    fig.data[0].meta = {"edited": True}
+
+    assert template() == before
+    assert as_json(create(*args)) == as_json(baseline(*args))
@@ -0,0 +1,124 @@
+import io
+import os
+import re
+import time
+import zipfile
+
+import pandas as pd
+import pytest
+
+import export
+from export import SchemaMismatch, build_export, sweep_exports
+
+
+def assessment(i, score=50, interactions=None):
+    return (f"id{i:03d}", 1_700_000_000.0 + i, {
+        "overall_risk": {"score_percent": score, "category": "moderate",
+                         "interpretation": "Review (dose) \\ adjust", "description": "d"},
+        "risk_breakdown": {
+            "systemic_risks": [{"system": "Renal", "risk_percent": 6}],
+            "comorbidity_impact": [{"comorbidity_description": "CKD", "risk_change_percent": 8}],
+        },
+        "drug_interactions": interactions if interactions is not None else [
+            {"drug": "Aspirin", "severity": "minor", "details": {"mechanism": "additive"}}],
+        "special_population_warnings": [],
+        "alternative_drugs": [{"name": "Pravastatin", "predicted_risk_percent": 20}],
+        "summary": "ok",
+    })
+
+
+def read_tables(path, fmt):
+    with zipfile.ZipFile(path) as archive:
+        read = pd.read_parquet if fmt == "parquet" else pd.read_csv
+        return {name.rsplit(".", 1)[0]: read(io.BytesIO(archive.read(name)))
+                for name in archive.namelist() if not name.startswith("pdf/")}
+
+
+@pytest.fixture
+def artifacts():
+    paths = []
+    yield paths
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "csv"])
+def test_round_trip(fmt, artifacts):
+    items = [assessment(i, score=i) for i in range(5)]
+    path = build_export(lambda: iter(items), fmt, chunk_size=2)
+    artifacts.append(path)
+
+    tables = read_tables(path, fmt)
+    assert set(tables) == set(export.TABLES)
+    assert list(tables["assessments"]["overall_risk.score_percent"]) == [0, 1, 2, 3, 4]
+    assert list(tables["drug_interactions"]["details.mechanism"]) == ["additive"] * 5
+    assert list(tables["systemic_risks"]["assessment_id"]) == [item[0] for item in items]
+
+
+def test_empty_input(artifacts):
+    path = build_export(lambda: iter([]), "parquet")
+    artifacts.append(path)
+
+    tables = read_tables(path, "parquet")
+    assert all(len(table) == 0 for table in tables.values())
+
+
+def test_mixed_types_widen(artifacts):
+    items = [assessment(0, score=40), assessment(1, score=40.5),
+             assessment(2, interactions=[{"drug": "A", "severity": 3, "notes": ["x", "y"]}])]
+    path = build_export(lambda: iter(items), "parquet")
+    artifacts.append(path)
+
+    tables = read_tables(path, "parquet")
+    assert list(tables["assessments"]["overall_risk.score_percent"]) == [40.0, 40.5, 50.0]
+    interactions = tables["drug_interactions"]
+    assert list(interactions["severity"]) == ["minor", "minor", "3"]
+    assert interactions["notes"].iloc[2] == '["x", "y"]'
+
+
+def test_pdf_entries(artifacts):
+    items = [assessment(i) for i in range(3)]
+    path = build_export(lambda: iter(items), "csv", include_pdf=True)
+    artifacts.append(path)
+
+    with zipfile.ZipFile(path) as archive:
+        pdfs = sorted(name for name in archive.namelist() if name.startswith("pdf/"))
+        assert pdfs == [f"pdf/{item[0]}.pdf" for item in items]
+        document = archive.read(pdfs[0])
+    assert document.startswith(b"%PDF-1.4") and document.rstrip().endswith(b"%%EOF")
+    assert b"Review \\(dose\\) \\\\ adjust" in document
+
+
+def test_pdf_uses_winansi_encoding():
+    document = export._pdf_document(["Dose \u2013 reduce \u2014 \u201cmonitor\u201d \u2022 \u20ac12 \u6f22"])
+    assert "Dose \u2013 reduce \u2014 \u201cmonitor\u201d \u2022 \u20ac12 ?".encode("cp1252") in document
+
+    # /Length counts the encoded bytes of the content stream
+    length = int(re.search(rb"/Length (\d+) >>\nstream\n", document).group(1))
+    stream = document.split(b"stream\n", 1)[1].split(b"\nendstream", 1)[0]
+    assert len(stream) == length
+
+
+def test_pdf_paginates():
+    document = export._pdf_document([f"line {i}" for i in range(2 * export.PDF_LINES_PER_PAGE + 1)])
+    assert b"/Count 3" in document
+
+
+@pytest.mark.parametrize("second_pass", [
+    [assessment(0, score=40.5)],  # float into an int64 column
+    [assessment(0, interactions=[{"drug": "A", "severity": "minor", "mechanism": "new"}])],  # unknown column
+])
+def test_rows_that_do_not_fit_the_schema_raise(second_pass):
+    passes = iter([[assessment(0, score=40)], second_pass])
+    with pytest.raises(SchemaMismatch):
+        build_export(lambda: iter(next(passes)), "parquet")
+
+
+def test_sweep_removes_old_artifacts(artifacts):
+    path = build_export(lambda: iter([]), "csv")
+    artifacts.append(path)
+    os.utime(path, (time.time() - 2 * export.EXPORT_MAX_AGE_S,) * 2)
+
+    sweep_exports()
+    assert not os.path.exists(path)
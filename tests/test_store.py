@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from store import BackendCallFailed, SharedStore, payload_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(str(tmp_path / "shared.db"), poll_interval_s=0.01)
+
+
+def run_concurrently(target, count):
+    outcomes = [None] * count
+
+    def run(i):
+        try:
+            outcomes[i] = target()
+        except Exception as exc:
+            outcomes[i] = exc
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_dedup_across_threads(store):
+    calls = []
+
+    def backend():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"score": 42}
+
+    outcomes = run_concurrently(lambda: store.get_or_compute({"patient": 1}, backend), 8)
+
+    assert outcomes == [{"score": 42}] * 8
+    assert len(calls) == 1
+    assert store.stats.misses == 1
+    assert store.stats.hits == 7
+
+
+def test_cache_hit_from_another_instance(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SharedStore(path).get_or_compute({"patient": 1}, lambda: {"score": 1})
+    other = SharedStore(path)
+    other.pid = -1  # stand-in for a different worker process
+
+    assert other.get_or_compute({"patient": 1}, lambda: pytest.fail("backend called")) == {"score": 1}
+    assert other.stats.cross_process_hits == 1
+
+
+def test_takeover_of_expired_job(tmp_path):
+    store = SharedStore(str(tmp_path / "shared.db"), job_timeout_s=1, poll_interval_s=0.01)
+    conn = store._connection()
+    conn.execute("INSERT INTO jobs (key, owner, started_at) VALUES (?, ?, ?)",
+                 (payload_key({"patient": 1}), "dead-worker", time.time() - 5))
+
+    assert store.get_or_compute({"patient": 1}, lambda: {"score": 7}) == {"score": 7}
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+
+def test_waiters_fail_fast_after_backend_error(store):
+    calls = []
+
+    def failing_backend():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ConnectionError("backend down")
+
+    outcomes = run_concurrently(lambda: store.get_or_compute({"patient": 1}, failing_backend), 4)
+
+    assert len(calls) == 1
+    assert sum(isinstance(o, ConnectionError) for o in outcomes) == 1
+    assert sum(isinstance(o, BackendCallFailed) for o in outcomes) == 3
+
+
+def test_new_caller_retries_right_after_backend_error(store):
+    def failing_backend():
+        raise ConnectionError("backend down")
+
+    calls = []
+
+    def backend():
+        calls.append(1)
+        return {"score": 3}
+
+    with pytest.raises(ConnectionError):
+        store.get_or_compute({"patient": 1}, failing_backend)
+
+    # Still within failure_ttl_s, but this caller was not waiting on the failed call
+    assert store.get_or_compute({"patient": 1}, backend) == {"score": 3}
+    assert len(calls) == 1
+    assert store.stats.shared_failures == 0
+
+
+def test_expired_cache_rows_are_pruned(tmp_path):
+    store = SharedStore(str(tmp_path / "shared.db"), cache_ttl_s=0.1)
+    store.get_or_compute({"patient": 1}, lambda: {"score": 1})
+    time.sleep(0.2)
+    store.get_or_compute({"patient": 2}, lambda: {"score": 2})
+
+    keys = [row[0] for row in store._connection().execute("SELECT key FROM response_cache")]
+    assert keys == [payload_key({"patient": 2})]
+
+
+def test_results_past_retention_are_pruned(tmp_path):
+    store = SharedStore(str(tmp_path / "shared.db"), result_retention_s=0.1)
+    old_id = store.save_result({"patient": 1}, {"score": 1})
+    time.sleep(0.2)
+    new_id = store.save_result({"patient": 2}, {"score": 2})
+
+    assert store.load_result(old_id) is None
+    payload, created_at, result = store.load_result(new_id)
+    assert payload == {"patient": 2}
+    assert result == {"score": 2}
+
+
+def test_iter_results_pages_through_ties(store):
+    conn = store._connection()
+    # Several rows share a created_at so pages must break ties on id
+    rows = [(f"id{i}", 100.0 + i // 3) for i in range(7)]
+    for result_id, created_at in rows:
+        conn.execute("INSERT INTO results (id, key, created_at, payload, result) VALUES (?, '', ?, '{}', ?)",
+                     (result_id, created_at, f'{{"n": "{result_id}"}}'))
+
+    for page_size in (1, 2, 3, 7, 10):
+        yielded = [(result_id, created_at) for result_id, created_at, _ in store.iter_results(page_size=page_size)]
+        assert yielded == rows
+
+
+def test_iter_results_empty(store):
+    assert list(store.iter_results()) == []
+
+
+def test_iter_results_until_pins_rows(store):
+    first = store.save_result({"patient": 1}, {"score": 1})
+    until = store.latest_result()
+    store.save_result({"patient": 2}, {"score": 2})
+
+    assert [result_id for result_id, _, _ in store.iter_results(until=until)] == [first]
+    assert len(list(store.iter_results())) == 2